@@ -0,0 +1,21 @@
+"""
+Celery application for the core project.
+
+Runs slow document processing (OCR and OpenAI calls) outside the request cycle.
+Start a worker with:
+    celery -A core worker -l info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+app = Celery("core")
+
+# Read CELERY_* settings from Django settings
+app.config_from_object("django.conf:settings", namespace="CELERY")
+
+# Load tasks.py from every installed app
+app.autodiscover_tasks()
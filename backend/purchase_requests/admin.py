@@ -1,10 +1,12 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from .models import UserProfile, PurchaseRequest, Approval, RequestItem
 
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ["user", "role", "department", "created_at"]
+    list_select_related = ["user"]
     list_filter = ["role", "created_at"]
     search_fields = ["user__username", "user__email", "department"]
     readonly_fields = ["created_at", "updated_at"]
@@ -15,6 +17,10 @@ class ApprovalInline(admin.TabularInline):
     extra = 0
     readonly_fields = ["created_at", "updated_at", "reviewed_at"]
 
+    def get_queryset(self, request):
+        # Each inline row prints Approval.__str__, which reads approver.username
+        return super().get_queryset(request).select_related("approver")
+
 
 class RequestItemInline(admin.TabularInline):
     model = RequestItem
@@ -22,9 +28,16 @@ class RequestItemInline(admin.TabularInline):
     readonly_fields = ["total_price", "created_at", "updated_at"]
 
 
+class PurchaseRequestChangeList(ChangeList):
+    """Changelist that doesn't load the JSON metadata columns it never displays"""
+    def get_queryset(self, request, *args, **kwargs):
+        return super().get_queryset(request, *args, **kwargs).without_metadata()
+
+
 @admin.register(PurchaseRequest)
 class PurchaseRequestAdmin(admin.ModelAdmin):
     list_display = ["title", "created_by", "amount", "status", "created_at"]
+    list_select_related = ["created_by"]
     list_filter = ["status", "created_at"]
     search_fields = ["title", "description", "created_by__username"]
     readonly_fields = ["id", "created_at", "updated_at", "approved_at", "rejected_at"]
@@ -44,10 +57,14 @@ class PurchaseRequestAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_changelist(self, request, **kwargs):
+        return PurchaseRequestChangeList
+
 
 @admin.register(Approval)
 class ApprovalAdmin(admin.ModelAdmin):
     list_display = ["purchase_request", "approver", "approver_level", "approved", "reviewed_at"]
+    list_select_related = ["purchase_request", "approver"]
     list_filter = ["approver_level", "approved", "created_at"]
     search_fields = ["purchase_request__title", "approver__username"]
     readonly_fields = ["id", "created_at", "updated_at", "reviewed_at"]
@@ -56,6 +73,7 @@ class ApprovalAdmin(admin.ModelAdmin):
 @admin.register(RequestItem)
 class RequestItemAdmin(admin.ModelAdmin):
     list_display = ["item_name", "purchase_request", "quantity", "unit_price", "total_price"]
+    list_select_related = ["purchase_request"]
     search_fields = ["item_name", "purchase_request__title"]
     readonly_fields = ["id", "total_price", "created_at", "updated_at"]
 
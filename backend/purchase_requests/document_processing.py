@@ -1,80 +1,479 @@
 """
 Document Processing Utilities for AI-based extraction and validation
-Uses OpenAI API, pytesseract, and pdfplumber for document processing
+Uses OpenAI API, pytesseract (or tesserocr when installed), and pdfplumber for document processing
 """
+import asyncio
+import hashlib
+import logging
 import os
-import json
+import mimetypes
+import multiprocessing
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal
+from functools import partial
 from typing import Dict, Any, Optional, List
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import UploadedFile
+import orjson
 import pdfplumber
 from PIL import Image
 import pytesseract
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
+from .file_types import sniff_content_type
+
+# Keep Tesseract's OpenMP threads from oversubscribing cores shared with
+# other workers; must be set before the library is loaded
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+try:
+    import tesserocr
+except ImportError:  # Fall back to spawning the tesseract binary via pytesseract
+    tesserocr = None
+
+
+logger = logging.getLogger(__name__)
+
+OPENAI_MODEL = "gpt-4o-mini"
+
+# Bump whenever a prompt changes so cached AI results are not reused
+PROMPT_VERSION = 1
+
+# Extracted text and AI results are cached for a day
+DOCUMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Rate-limit (429) and connection errors are retried by the OpenAI clients
+# themselves, with exponential backoff
+OPENAI_MAX_RETRIES = 3
+
+# Maximum number of OpenAI requests in flight for a batched extraction
+OPENAI_MAX_CONCURRENCY = 4
 
 # Initialize OpenAI client
-client = OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+# The async client is created per batched extraction instead: async_to_sync
+# runs each call on a fresh event loop, and pooled connections can't outlive
+# the loop they were opened on
+if settings.OPENAI_API_KEY:
+    client = OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=OPENAI_MAX_RETRIES)
+else:
+    client = None
+
+# In-process Tesseract API, created on first use (tesserocr only).
+# The API is not thread-safe, so calls are serialized with a lock
+_tess_api = None
+_tess_lock = threading.Lock()
+
+# Buffer size used when spooling uploads to disk (1 MiB)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# PDFs with fewer pages are parsed in-process, a process pool costs more than it saves
+PDF_PARALLEL_MIN_PAGES = 3
+
+# Pages yielding fewer characters than this are treated as scans and OCR'd
+PDF_OCR_MIN_TEXT_CHARS = 20
+
+# Extracted text is capped at this many characters per document before prompting
+LLM_MAX_INPUT_CHARS = 12000
+
+# OCR noise dropped before prompting: runs of spaces/tabs, "Page 2" / "Page 2 of 5" lines
+_HORIZONTAL_SPACE_RE = re.compile(r"[ \t\f\v]+")
+_PAGE_MARKER_RE = re.compile(r"^page \d+(\s*(of|/)\s*\d+)?$", re.IGNORECASE)
+
+# Limits for packing several proformas into one OpenAI request
+PROFORMA_BATCH_MAX_TOKENS = 12000
+PROFORMA_BATCH_MAX_DOCUMENTS = 10
+
+
+def _page_text(page) -> str:
+    """
+    Text of a pdfplumber page
+    Pages without a usable text layer (scans) are rendered and OCR'd instead
+    """
+    text = page.extract_text() or ""
+    if len(text.strip()) >= PDF_OCR_MIN_TEXT_CHARS:
+        return text
+    try:
+        ocr_text = _ocr_image(page.to_image(resolution=settings.PDF_OCR_DPI).original)
+    except Exception:
+        logger.exception("OCR failed for PDF page %s", page.page_number)
+        return text
+    return ocr_text if len(ocr_text.strip()) > len(text.strip()) else text
+
+
+def _extract_pages_text(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract text from a contiguous range of PDF pages (runs in a worker process)"""
+    with pdfplumber.open(file_path) as pdf:
+        return [_page_text(page) for page in pdf.pages[start:stop]]
+
+
+def _reset_ocr_state():
+    """
+    Pool worker initializer: forked workers inherit the parent's Tesseract API
+    and lock, and the lock may be held by another parent thread at fork time,
+    which would block the worker on its first scanned page forever
+    """
+    global _tess_api, _tess_lock
+    _tess_api = None
+    _tess_lock = threading.Lock()
+
+
+def _extract_pages_text_parallel(file_path: str, page_count: int) -> List[str]:
+    """
+    Extract text from all pages, one contiguous page range per worker process,
+    so each worker opens the file once
+    """
+    max_workers = min(os.cpu_count() or 1, page_count)
+    pages_per_worker = -(-page_count // max_workers)  # ceiling division
+    starts = range(0, page_count, pages_per_worker)
+    stops = [min(start + pages_per_worker, page_count) for start in starts]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_reset_ocr_state) as executor:
+        # map() yields results in page order
+        chunks = executor.map(partial(_extract_pages_text, file_path), starts, stops)
+        return [text for chunk in chunks for text in chunk]
 
 
 def extract_text_from_pdf(file_path: str) -> str:
-    """Extract text from PDF using pdfplumber"""
+    """
+    Extract text from PDF using pdfplumber, falling back to OCR for scanned pages
+    Larger PDFs are spread over a process pool, except inside daemonic
+    processes (Celery prefork workers), which may not have children
+    """
     try:
         with pdfplumber.open(file_path) as pdf:
-            text = ""
-            for page in pdf.pages:
-                text += page.extract_text() or ""
-        return text.strip()
-    except Exception as e:
-        print(f"Error extracting text from PDF: {e}")
+            page_count = len(pdf.pages)
+            if page_count >= PDF_PARALLEL_MIN_PAGES and not multiprocessing.current_process().daemon:
+                try:
+                    parts = _extract_pages_text_parallel(file_path, page_count)
+                    return "\n".join(parts).strip()
+                except Exception:
+                    logger.exception("Parallel PDF extraction failed for %s, extracting serially", file_path)
+            parts = [_page_text(page) for page in pdf.pages]
+            return "\n".join(parts).strip()
+    except Exception:
+        logger.exception("PDF text extraction failed for %s", file_path)
         return ""
 
 
+def _ocr_image(image: Image.Image) -> str:
+    """
+    Run OCR on an image
+    Uses a reused in-process tesserocr API when installed, avoiding a tesseract
+    subprocess and temp files per call, otherwise pytesseract
+    """
+    global _tess_api
+    if tesserocr is None:
+        return pytesseract.image_to_string(image)
+    with _tess_lock:
+        if _tess_api is None:
+            _tess_api = tesserocr.PyTessBaseAPI(lang="eng", psm=tesserocr.PSM.AUTO)
+        _tess_api.SetImage(image)
+        return _tess_api.GetUTF8Text()
+
+
 def extract_text_from_image(file_path: str) -> str:
-    """Extract text from image using OCR (pytesseract)"""
+    """Extract text from image using OCR (tesserocr or pytesseract)"""
     try:
-        image = Image.open(file_path)
-        text = pytesseract.image_to_string(image)
+        with Image.open(file_path) as image:
+            text = _ocr_image(image)
         return text.strip()
-    except Exception as e:
-        print(f"Error extracting text from image: {e}")
+    except Exception:
+        logger.exception("Image OCR failed for %s", file_path)
         return ""
 
 
+def _file_digest(file_obj: UploadedFile) -> str:
+    """SHA-256 hex digest of the file contents, streamed chunk by chunk"""
+    digest = hashlib.sha256()
+    for chunk in file_obj.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _ai_cache_key(kind: str, *parts: str) -> str:
+    """Cache key for an AI result, scoped to the model and prompt version"""
+    digest = hashlib.sha256()
+    for part in (OPENAI_MODEL, str(PROMPT_VERSION)) + parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return f"ai:{kind}:{digest.hexdigest()}"
+
+
+def _sniff_content_type(file_obj: UploadedFile) -> Optional[str]:
+    """MIME type from the file's leading bytes, else guessed from its name"""
+    try:
+        content_type = sniff_content_type(file_obj)
+    except Exception:
+        logger.exception("Could not sniff the content type of %s", file_obj.name)
+        content_type = None
+    return content_type or mimetypes.guess_type(file_obj.name)[0]
+
+
 def extract_text_from_file(file_obj: UploadedFile) -> str:
     """
     Extract text from uploaded file (PDF or image)
-    Saves file temporarily, extracts text, then cleans up
+    Results are cached by content hash, so re-uploads and retries skip extraction
+    Otherwise streams the file to a private temporary file, extracts text, then cleans up
     """
-    # Save file temporarily
-    temp_path = f"/tmp/{file_obj.name}"
-    with open(temp_path, 'wb+') as destination:
-        for chunk in file_obj.chunks():
-            destination.write(chunk)
+    # Uploaded files carry a content type (sniffed by the serializers where
+    # it matters); stored FieldFiles, as read by the background tasks, don't,
+    # so sniff their leading bytes rather than trust the file name
+    content_type = getattr(file_obj, 'content_type', None) or _sniff_content_type(file_obj)
     
-    # Extract text based on file type
-    content_type = file_obj.content_type
-    if content_type == 'application/pdf':
-        text = extract_text_from_pdf(temp_path)
-    elif content_type in ['image/jpeg', 'image/png', 'image/jpg']:
-        text = extract_text_from_image(temp_path)
-    else:
-        text = ""
+    cache_key = f"document-text:{content_type}:{_file_digest(file_obj)}"
+    text = cache.get(cache_key)
+    if text is not None:
+        return text
+    
+    # Save file temporarily under a unique name so concurrent uploads can't collide
+    if file_obj.seekable():
+        file_obj.seek(0)
+    suffix = os.path.splitext(file_obj.name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as destination:
+        shutil.copyfileobj(file_obj, destination, length=COPY_BUFFER_SIZE)
+        temp_path = destination.name
     
-    # Clean up
     try:
-        os.remove(temp_path)
-    except:
-        pass
+        # Extract text based on file type
+        if content_type == 'application/pdf':
+            text = extract_text_from_pdf(temp_path)
+        elif content_type in ['image/jpeg', 'image/png', 'image/jpg']:
+            text = extract_text_from_image(temp_path)
+        else:
+            text = ""
+    finally:
+        # Clean up
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+    
+    # Failed extractions return "", don't pin those
+    if text:
+        cache.set(cache_key, text, DOCUMENT_CACHE_TIMEOUT)
     
     return text
 
 
+def _compact_for_llm(text: str, max_chars: int = LLM_MAX_INPUT_CHARS) -> str:
+    """
+    Shrink extracted text before it is put into a prompt
+    Collapses whitespace, drops blank lines, page-number lines and adjacent
+    duplicate lines (repeated headers/footers), then truncates to max_chars
+    """
+    lines = []
+    for line in text.splitlines():
+        line = _HORIZONTAL_SPACE_RE.sub(" ", line).strip()
+        if not line or _PAGE_MARKER_RE.match(line):
+            continue
+        if lines and lines[-1] == line:
+            continue
+        lines.append(line)
+    compacted = "\n".join(lines)[:max_chars]
+    logger.debug("Compacted LLM input from %d to %d chars", len(text), len(compacted))
+    return compacted
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return len(text) // 4
+
+
+def _split_into_batches(texts: List[str]) -> List[List[int]]:
+    """
+    Group document indexes into batches that stay within the per-request
+    token budget and document count
+    """
+    batches = []
+    current = []
+    used_tokens = 0
+    for index, text in enumerate(texts):
+        tokens = _estimate_tokens(text)
+        if current and (
+            used_tokens + tokens > PROFORMA_BATCH_MAX_TOKENS
+            or len(current) >= PROFORMA_BATCH_MAX_DOCUMENTS
+        ):
+            batches.append(current)
+            current = []
+            used_tokens = 0
+        current.append(index)
+        used_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _proforma_batch_messages(texts: List[str]) -> List[Dict[str, str]]:
+    """Build the chat messages asking for metadata of a batch of proforma texts"""
+    documents = "\n\n".join(
+        f"--- Document {number} ---\n{text}" for number, text in enumerate(texts, start=1)
+    )
+    prompt = f"""
+    Extract the following information from each of the {len(texts)} proforma invoices/quotations below:
+    
+    1. Vendor name and contact details
+    2. Invoice/Quote number
+    3. Date
+    4. List of items with descriptions, quantities, unit prices, and totals
+    5. Subtotal, tax, and total amount
+    6. Payment terms
+    7. Delivery terms
+    
+    Proforma documents:
+    {documents}
+    
+    Return a JSON object with a "results" array holding exactly one object
+    per document, in document order, each with these keys:
+    - vendor_name
+    - vendor_contact (email, phone, address)
+    - invoice_number
+    - date
+    - items (array of objects with: name, description, quantity, unit_price, total)
+    - subtotal
+    - tax_amount
+    - total_amount
+    - payment_terms
+    - delivery_terms
+    
+    If any field is not found, use null.
+    """
+    return [
+        {"role": "system", "content": "You are a document processing assistant that extracts structured data from invoices and quotations. Always return valid JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _proforma_batch_results(content: str, texts: List[str]) -> List[Dict[str, Any]]:
+    """Metadata per proforma text from the JSON answer to _proforma_batch_messages()"""
+    results = orjson.loads(content)["results"]
+    if len(results) != len(texts):
+        raise ValueError(f"Expected {len(texts)} results, got {len(results)}")
+    
+    for metadata, text in zip(results, texts):
+        metadata["extracted"] = True
+        metadata["raw_text"] = text[:500]  # Store first 500 chars for reference
+    
+    return results
+
+
+def _proforma_batch_errors(error: Exception, texts: List[str]) -> List[Dict[str, Any]]:
+    """Failed-extraction metadata for each proforma text of a batch"""
+    return [
+        {
+            "error": str(error),
+            "extracted": False,
+            "raw_text": text[:500]
+        }
+        for text in texts
+    ]
+
+
+def _extract_proforma_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    """Extract metadata for a batch of proforma texts with a single call on the pooled client"""
+    try:
+        response = client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=_proforma_batch_messages(texts),
+            temperature=0.1,
+            response_format={"type": "json_object"}
+        )
+        return _proforma_batch_results(response.choices[0].message.content, texts)
+    except Exception as e:
+        return _proforma_batch_errors(e, texts)
+
+
+async def _extract_proforma_batch_async(
+    async_client: AsyncOpenAI, texts: List[str], semaphore: asyncio.Semaphore
+) -> List[Dict[str, Any]]:
+    """Extract metadata for a batch of proforma texts with a single OpenAI call"""
+    try:
+        async with semaphore:
+            response = await async_client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=_proforma_batch_messages(texts),
+                temperature=0.1,
+                response_format={"type": "json_object"}
+            )
+        return _proforma_batch_results(response.choices[0].message.content, texts)
+    except Exception as e:
+        return _proforma_batch_errors(e, texts)
+
+
+async def extract_proforma_metadata_batch_async(texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Extract proforma/quotation metadata for several documents using OpenAI API
+    Documents are packed into as few requests as the token budget allows and
+    the requests run concurrently, at most OPENAI_MAX_CONCURRENCY at a time
+    Returns one metadata dict per text, in input order
+    """
+    if not settings.OPENAI_API_KEY:
+        return [
+            {
+                "error": "OpenAI API key not configured",
+                "extracted": False
+            }
+            for _ in texts
+        ]
+    
+    texts = [_compact_for_llm(text) for text in texts]
+    results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+    
+    # Serve documents seen before from the cache
+    cache_keys = [_ai_cache_key("proforma", text) for text in texts]
+    cached = await cache.aget_many(cache_keys)
+    pending = []
+    for index, key in enumerate(cache_keys):
+        if key in cached:
+            results[index] = cached[key]
+        else:
+            pending.append(index)
+    
+    semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+    batches = [
+        [pending[position] for position in batch]
+        for batch in _split_into_batches([texts[index] for index in pending])
+    ]
+    batch_results = []
+    if batches:
+        # Scoped to this event loop, see the note on the module-level client
+        async with AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY, max_retries=OPENAI_MAX_RETRIES
+        ) as async_client:
+            batch_results = await asyncio.gather(*(
+                _extract_proforma_batch_async(
+                    async_client, [texts[index] for index in batch], semaphore
+                )
+                for batch in batches
+            ))
+    
+    to_cache = {}
+    for batch, metadata_list in zip(batches, batch_results):
+        for index, metadata in zip(batch, metadata_list):
+            results[index] = metadata
+            if metadata.get("extracted"):
+                to_cache[cache_keys[index]] = metadata
+    if to_cache:
+        await cache.aset_many(to_cache, DOCUMENT_CACHE_TIMEOUT)
+    
+    return results
+
+
+def extract_proforma_metadata_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    """Synchronous wrapper around extract_proforma_metadata_batch_async for views and tasks"""
+    return async_to_sync(extract_proforma_metadata_batch_async)(texts)
+
+
 def extract_proforma_metadata_with_ai(text: str) -> Dict[str, Any]:
     """
     Extract proforma/quotation metadata using OpenAI API
     Returns structured data: vendor, items, prices, terms, etc.
+    A single document goes through the module's pooled sync client; the
+    batched path would open a new async client and event loop for it
     """
     if not client:
         return {
@@ -82,58 +481,16 @@ def extract_proforma_metadata_with_ai(text: str) -> Dict[str, Any]:
             "extracted": False
         }
     
-    try:
-        prompt = f"""
-        Extract the following information from this proforma invoice/quotation:
-        
-        1. Vendor name and contact details
-        2. Invoice/Quote number
-        3. Date
-        4. List of items with descriptions, quantities, unit prices, and totals
-        5. Subtotal, tax, and total amount
-        6. Payment terms
-        7. Delivery terms
-        
-        Proforma text:
-        {text}
-        
-        Return the data as a JSON object with these keys:
-        - vendor_name
-        - vendor_contact (email, phone, address)
-        - invoice_number
-        - date
-        - items (array of objects with: name, description, quantity, unit_price, total)
-        - subtotal
-        - tax_amount
-        - total_amount
-        - payment_terms
-        - delivery_terms
-        
-        If any field is not found, use null.
-        """
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a document processing assistant that extracts structured data from invoices and quotations. Always return valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1,
-            response_format={"type": "json_object"}
-        )
-        
-        metadata = json.loads(response.choices[0].message.content)
-        metadata["extracted"] = True
-        metadata["raw_text"] = text[:500]  # Store first 500 chars for reference
-        
+    text = _compact_for_llm(text)
+    cache_key = _ai_cache_key("proforma", text)
+    metadata = cache.get(cache_key)
+    if metadata is not None:
         return metadata
-        
-    except Exception as e:
-        return {
-            "error": str(e),
-            "extracted": False,
-            "raw_text": text[:500]
-        }
+    
+    metadata = _extract_proforma_batch([text])[0]
+    if metadata.get("extracted"):
+        cache.set(cache_key, metadata, DOCUMENT_CACHE_TIMEOUT)
+    return metadata
 
 
 def generate_purchase_order(request_data: Dict[str, Any], proforma_metadata: Dict[str, Any]) -> Dict[str, Any]:
@@ -155,10 +512,10 @@ def generate_purchase_order(request_data: Dict[str, Any], proforma_metadata: Dic
         - Title: {request_data.get('title')}
         - Description: {request_data.get('description')}
         - Amount: {request_data.get('amount')}
-        - Items: {json.dumps(request_data.get('items', []))}
+        - Items: {orjson.dumps(request_data.get('items', []), default=str).decode()}
         
         Proforma Metadata:
-        {json.dumps(proforma_metadata, indent=2)}
+        {orjson.dumps(proforma_metadata, default=str, option=orjson.OPT_INDENT_2).decode()}
         
         Generate a Purchase Order with:
         1. PO Number (format: PO-YYYYMMDD-XXXX)
@@ -186,7 +543,7 @@ def generate_purchase_order(request_data: Dict[str, Any], proforma_metadata: Dic
         """
         
         response = client.chat.completions.create(
-            model="gpt-4o-mini",
+            model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "You are a procurement assistant that generates formal purchase orders. Always return valid JSON."},
                 {"role": "user", "content": prompt}
@@ -195,12 +552,13 @@ def generate_purchase_order(request_data: Dict[str, Any], proforma_metadata: Dic
             response_format={"type": "json_object"}
         )
         
-        po_data = json.loads(response.choices[0].message.content)
+        po_data = orjson.loads(response.choices[0].message.content)
         po_data["generated"] = True
         
         return po_data
         
     except Exception as e:
+        logger.exception("Purchase order generation failed")
         return {
             "error": str(e),
             "generated": False
@@ -218,6 +576,12 @@ def validate_receipt_against_po(receipt_text: str, po_metadata: Dict[str, Any])
             "validated": False
         }
     
+    receipt_text = _compact_for_llm(receipt_text)
+    cache_key = _ai_cache_key("receipt", receipt_text, orjson.dumps(po_metadata, default=str, option=orjson.OPT_SORT_KEYS).decode())
+    validation = cache.get(cache_key)
+    if validation is not None:
+        return validation
+    
     try:
         prompt = f"""
         Compare this receipt with the Purchase Order and identify any discrepancies:
@@ -226,7 +590,7 @@ def validate_receipt_against_po(receipt_text: str, po_metadata: Dict[str, Any])
         {receipt_text}
         
         Purchase Order:
-        {json.dumps(po_metadata, indent=2)}
+        {orjson.dumps(po_metadata, default=str, option=orjson.OPT_INDENT_2).decode()}
         
         Check for:
         1. Vendor name matches
@@ -249,7 +613,7 @@ def validate_receipt_against_po(receipt_text: str, po_metadata: Dict[str, Any])
         """
         
         response = client.chat.completions.create(
-            model="gpt-4o-mini",
+            model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "You are a financial auditor that validates receipts against purchase orders. Always return valid JSON with detailed comparisons."},
                 {"role": "user", "content": prompt}
@@ -258,13 +622,15 @@ def validate_receipt_against_po(receipt_text: str, po_metadata: Dict[str, Any])
             response_format={"type": "json_object"}
         )
         
-        validation = json.loads(response.choices[0].message.content)
+        validation = orjson.loads(response.choices[0].message.content)
         validation["validated"] = True
         validation["receipt_text"] = receipt_text[:500]  # Store first 500 chars
+        cache.set(cache_key, validation, DOCUMENT_CACHE_TIMEOUT)
         
         return validation
         
     except Exception as e:
+        logger.exception("Receipt validation failed")
         return {
             "error": str(e),
             "validated": False,
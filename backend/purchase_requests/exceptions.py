@@ -0,0 +1,18 @@
+from django.core.exceptions import RequestDataTooBig
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler
+
+
+def exception_handler(exc, context):
+    """
+    DRF's exception handler, plus JSON 413 responses for oversized request
+    bodies and uploads (raised by Django and MaxSizeUploadHandler while
+    request.data is parsed), which DRF would leave to Django's HTML 400 page
+    """
+    if isinstance(exc, RequestDataTooBig):
+        return Response(
+            {"error": str(exc)},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+    return drf_exception_handler(exc, context)
@@ -0,0 +1,30 @@
+from typing import Optional
+
+try:
+    import magic
+except ImportError:  # python-magic or the system libmagic library is missing
+    magic = None
+
+
+# Leading bytes of the document types the app accepts, used without libmagic
+SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+
+
+def sniff_content_type(file_obj) -> Optional[str]:
+    """
+    MIME type of a file from its leading bytes (libmagic when available,
+    otherwise the signatures of the accepted types); the file is rewound
+    """
+    file_obj.seek(0)
+    head = file_obj.read(2048)
+    file_obj.seek(0)
+    if magic is not None:
+        return magic.from_buffer(head, mime=True)
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
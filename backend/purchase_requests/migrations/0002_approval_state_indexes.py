@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("purchase_requests", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="approval",
+            name="approvals_purchas_24b1ea_idx",
+        ),
+        migrations.AddIndex(
+            model_name="approval",
+            index=models.Index(
+                fields=["purchase_request", "approver_level", "approved"],
+                name="appr_pr_lvl_ok_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="approval",
+            index=models.Index(
+                condition=models.Q(("approved", True)),
+                fields=["purchase_request"],
+                name="appr_pr_ok_partial",
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("purchase_requests", "0002_approval_state_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="purchaserequest",
+            name="purchase_re_status_f43ba2_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="purchaserequest",
+            name="purchase_re_created_2b6b2b_idx",
+        ),
+        migrations.AddIndex(
+            model_name="purchaserequest",
+            index=models.Index(
+                fields=["status", "-created_at", "-id"], name="pr_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="purchaserequest",
+            index=models.Index(
+                fields=["created_by", "-created_at", "-id"],
+                name="pr_createdby_created_idx",
+            ),
+        ),
+    ]
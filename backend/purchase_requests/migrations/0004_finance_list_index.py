@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("purchase_requests", "0003_cursor_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="purchaserequest",
+            index=models.Index(
+                fields=["status", "-approved_at", "-created_at"],
+                name="pr_status_approved_idx",
+            ),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.db.models import Q
+from django.utils import timezone
 import uuid
 
 
@@ -38,6 +39,41 @@ class RequestStatus(models.TextChoices):
     REJECTED = "rejected", "Rejected"
 
 
+class PurchaseRequestQuerySet(models.QuerySet):
+    """Custom queryset for purchase requests"""
+
+    # Potentially large JSON dumps of extracted/generated document data
+    METADATA_FIELDS = (
+        "proforma_metadata",
+        "purchase_order_metadata",
+        "receipt_metadata",
+        "receipt_validation",
+    )
+
+    def list_view(self):
+        """Load only the columns rendered by list endpoints, creator included"""
+        return self.select_related("created_by").only(
+            "id", "title", "amount", "status", "created_at", "updated_at",
+            "created_by__id", "created_by__username", "created_by__email",
+            "created_by__first_name", "created_by__last_name",
+        )
+
+    def with_detail_relations(self):
+        """Load everything the detail serializer renders: creator, items, approvals and approvers"""
+        return self.select_related("created_by").prefetch_related(
+            "items", self.approvals_prefetch()
+        )
+
+    @staticmethod
+    def approvals_prefetch():
+        """Prefetch of a request's approvals with their approvers"""
+        return models.Prefetch("approvals", queryset=Approval.objects.select_related("approver"))
+
+    def without_metadata(self):
+        """Skip the JSON metadata columns"""
+        return self.defer(*self.METADATA_FIELDS)
+
+
 class PurchaseRequest(models.Model):
     """Main purchase request model"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -78,38 +114,66 @@ class PurchaseRequest(models.Model):
     approved_at = models.DateTimeField(null=True, blank=True)
     rejected_at = models.DateTimeField(null=True, blank=True)
     
+    objects = PurchaseRequestQuerySet.as_manager()
+
     class Meta:
         db_table = "purchase_requests"
         ordering = ["-created_at"]
         indexes = [
-            models.Index(fields=["status", "-created_at"]),
-            models.Index(fields=["created_by", "-created_at"]),
+            # -id breaks created_at ties the same way RequestCursorPagination does,
+            # so cursor pages are read straight off these indexes
+            models.Index(fields=["status", "-created_at", "-id"], name="pr_status_created_idx"),
+            models.Index(fields=["created_by", "-created_at", "-id"], name="pr_createdby_created_idx"),
+            # Finance list: WHERE status = ... ORDER BY approved_at DESC, created_at DESC
+            models.Index(fields=["status", "-approved_at", "-created_at"], name="pr_status_approved_idx"),
         ]
 
     def __str__(self):
         return f"{self.title} - {self.get_status_display()}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a save can tell which status the request moved from
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def _approval_state(self):
+        """
+        Return (level_1_approved, level_2_approved, has_rejection).
+        Walks self.approvals.all() so a prefetch_related('approvals') is reused.
+        """
+        level_1_approved = level_2_approved = has_rejection = False
+        for approval in self.approvals.all():
+            if approval.approved is False:
+                has_rejection = True
+            elif approval.approved is True:
+                if approval.approver_level == 1:
+                    level_1_approved = True
+                elif approval.approver_level == 2:
+                    level_2_approved = True
+        return level_1_approved, level_2_approved, has_rejection
+
     @property
     def requires_level_1_approval(self):
         """Check if Level 1 approval is required"""
-        return not self.approvals.filter(approver_level=1, approved=True).exists()
+        return not self._approval_state()[0]
 
     @property
     def requires_level_2_approval(self):
         """Check if Level 2 approval is required"""
-        return not self.approvals.filter(approver_level=2, approved=True).exists()
+        return not self._approval_state()[1]
 
     @property
     def is_fully_approved(self):
         """Check if all required approvals are completed"""
-        level_1_approved = self.approvals.filter(approver_level=1, approved=True).exists()
-        level_2_approved = self.approvals.filter(approver_level=2, approved=True).exists()
+        level_1_approved, level_2_approved, _ = self._approval_state()
         return level_1_approved and level_2_approved
 
     @property
     def is_rejected(self):
         """Check if request has been rejected"""
-        return self.approvals.filter(approved=False).exists()
+        return self._approval_state()[2]
 
     def can_be_edited_by(self, user):
         """Check if user can edit this request"""
@@ -150,7 +214,9 @@ class Approval(models.Model):
         ordering = ["approver_level", "-created_at"]
         unique_together = [["purchase_request", "approver_level"]]
         indexes = [
-            models.Index(fields=["purchase_request", "approver_level"]),
+            # Covers the (purchase_request, approver_level, approved) EXISTS probes
+            models.Index(fields=["purchase_request", "approver_level", "approved"], name="appr_pr_lvl_ok_idx"),
+            models.Index(fields=["purchase_request"], condition=Q(approved=True), name="appr_pr_ok_partial"),
             models.Index(fields=["approver", "-created_at"]),
         ]
 
@@ -163,6 +229,27 @@ class Approval(models.Model):
         return f"Level {self.approver_level} - {status} by {self.approver.username}"
 
 
+class RequestItemQuerySet(models.QuerySet):
+    """Custom queryset for request items"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Bulk insert items, filling in total_price since save() is bypassed"""
+        objs = list(objs)
+        for item in objs:
+            item.calculate_total_price()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        """Bulk update items, keeping total_price and updated_at in step with save()"""
+        objs = list(objs)
+        now = timezone.now()
+        for item in objs:
+            item.calculate_total_price()
+            item.updated_at = now
+        fields = list(dict.fromkeys([*fields, "total_price", "updated_at"]))
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
 class RequestItem(models.Model):
     """Individual items in a purchase request"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -188,6 +275,8 @@ class RequestItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RequestItemQuerySet.as_manager()
+
     class Meta:
         db_table = "request_items"
         ordering = ["created_at"]
@@ -195,8 +284,12 @@ class RequestItem(models.Model):
     def __str__(self):
         return f"{self.item_name} x {self.quantity}"
 
+    def calculate_total_price(self):
+        """Set total_price from quantity and unit price"""
+        self.total_price = self.quantity * self.unit_price
+
     def save(self, *args, **kwargs):
         """Calculate total price before saving"""
-        self.total_price = self.quantity * self.unit_price
+        self.calculate_total_price()
         super().save(*args, **kwargs)
 
@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+
+class RequestCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the newest requests first.
+    Pages are fetched with a WHERE on (created_at, id) instead of COUNT + OFFSET,
+    so every page costs the same no matter how deep the client scrolls
+    """
+    ordering = ("-created_at", "-id")
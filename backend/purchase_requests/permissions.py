@@ -2,59 +2,59 @@ from rest_framework import permissions
 from .models import UserRole
 
 
-class IsStaff(permissions.BasePermission):
-    """Permission check for Staff role"""
+_UNSET = object()
+
+
+def get_cached_profile(request):
+    """
+    Return the profile of the requesting user, or None.
+    The profile is loaded at most once per request and memoized on the request,
+    so stacked role permissions don't each hit the database.
+    """
+    profile = getattr(request, "_cached_profile", _UNSET)
+    if profile is _UNSET:
+        user = request.user
+        profile = None
+        if user and user.is_authenticated:
+            # Going through the descriptor also caches the profile on the user,
+            # so later `request.user.profile` lookups in views are free as well
+            profile = getattr(user, "profile", None)
+        request._cached_profile = profile
+    return profile
+
+
+class BaseRolePermission(permissions.BasePermission):
+    """Base permission check for users whose profile role is in `allowed_roles`"""
+    allowed_roles = ()
+
     def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and
-            hasattr(request.user, 'profile') and
-            request.user.profile.role == UserRole.STAFF
-        )
+        profile = get_cached_profile(request)
+        return profile is not None and profile.role in self.allowed_roles
 
 
-class IsApproverLevel1(permissions.BasePermission):
+class IsStaff(BaseRolePermission):
+    """Permission check for Staff role"""
+    allowed_roles = (UserRole.STAFF,)
+
+
+class IsApproverLevel1(BaseRolePermission):
     """Permission check for Approver Level 1 role"""
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and
-            hasattr(request.user, 'profile') and
-            request.user.profile.role == UserRole.APPROVER_L1
-        )
+    allowed_roles = (UserRole.APPROVER_L1,)
 
 
-class IsApproverLevel2(permissions.BasePermission):
+class IsApproverLevel2(BaseRolePermission):
     """Permission check for Approver Level 2 role"""
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and
-            hasattr(request.user, 'profile') and
-            request.user.profile.role == UserRole.APPROVER_L2
-        )
+    allowed_roles = (UserRole.APPROVER_L2,)
 
 
-class IsAnyApprover(permissions.BasePermission):
+class IsAnyApprover(BaseRolePermission):
     """Permission check for any Approver role (Level 1 or 2)"""
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and
-            hasattr(request.user, 'profile') and
-            request.user.profile.role in [UserRole.APPROVER_L1, UserRole.APPROVER_L2]
-        )
+    allowed_roles = (UserRole.APPROVER_L1, UserRole.APPROVER_L2)
 
 
-class IsFinance(permissions.BasePermission):
+class IsFinance(BaseRolePermission):
     """Permission check for Finance role"""
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and
-            hasattr(request.user, 'profile') and
-            request.user.profile.role == UserRole.FINANCE
-        )
+    allowed_roles = (UserRole.FINANCE,)
 
 
 class IsRequestOwner(permissions.BasePermission):
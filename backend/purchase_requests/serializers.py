@@ -1,5 +1,13 @@
+from decimal import Decimal
+
 from rest_framework import serializers
-from django.contrib.auth.models import User
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, UserManager
+from django.db import transaction
+from .file_types import sniff_content_type
 from .models import UserProfile, UserRole, PurchaseRequest, Approval, RequestItem, RequestStatus
 
 
@@ -20,6 +28,34 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
+# Serialized profile payloads are cached per user and dropped when the user
+# or profile is saved (see signals.py)
+PROFILE_CACHE_TIMEOUT = 60
+
+
+def profile_cache_key(user_id):
+    """Cache key of the serialized profile of a user"""
+    return f"profile:{user_id}"
+
+
+# Finance statistics are cached globally and dropped whenever a purchase
+# request is saved or deleted (see signals.py)
+FINANCE_STATS_CACHE_KEY = "finance:stats"
+FINANCE_STATS_CACHE_TIMEOUT = 60
+
+# Request lists are versioned per scope (all requests, a creator's requests,
+# one status) for conditional GETs; a change to a request gives every scope
+# showing it a new version (see signals.py). Versions expire so that
+# per-process caches can't keep answering 304 for another process's changes
+# for long
+REQUEST_LIST_VERSION_TIMEOUT = 60
+
+
+def request_list_version_key(scope):
+    """Cache key of the version of a request list scope"""
+    return f"requests:list-version:{scope}"
+
+
 class UserMinimalSerializer(serializers.ModelSerializer):
     """Minimal user serializer for nested representations"""
     class Meta:
@@ -28,6 +64,16 @@ class UserMinimalSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
+class LoginSerializer(TokenObtainPairSerializer):
+    """
+    Username/password login issuing a JWT pair
+    Authenticates and mints the tokens in one pass; the authenticated user is
+    left on `serializer.user`
+    """
+    def validate(self, attrs):
+        return {"tokens": super().validate(attrs)}
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     """Serializer for user registration"""
     password = serializers.CharField(write_only=True, min_length=8)
@@ -47,8 +93,9 @@ class RegisterSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"password": "Passwords do not match"})
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
-        """Create user and profile"""
+        """Create user and profile (atomically, so no user is left without a profile)"""
         # Remove extra fields
         validated_data.pop("password_confirm")
         role = validated_data.pop("role")
@@ -68,15 +115,95 @@ class RegisterSerializer(serializers.ModelSerializer):
         
         return user
 
+    @classmethod
+    @transaction.atomic
+    def bulk_create_users(cls, data_list):
+        """
+        Register many users at once (e.g. imports)
+        Every entry is validated like a single registration, and usernames must
+        also be unique within the batch; then users and profiles are each
+        inserted with bulk INSERTs instead of per-row saves
+        """
+        serializer = cls(data=data_list, many=True)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data
+        
+        # The per-entry unique check only sees users already in the database
+        seen = set()
+        errors = []
+        for row in rows:
+            username = User.normalize_username(row["username"])
+            if username in seen:
+                errors.append({"username": ["This username appears more than once in the batch."]})
+            else:
+                errors.append({})
+                seen.add(username)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=User.normalize_username(row["username"]),
+                    email=UserManager.normalize_email(row.get("email", "")),
+                    first_name=row.get("first_name", ""),
+                    last_name=row.get("last_name", ""),
+                    password=make_password(row["password"]),
+                )
+                for row in rows
+            ],
+            batch_size=500,
+        )
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(
+                    user=user,
+                    role=row["role"],
+                    department=row.get("department", ""),
+                    phone_number=row.get("phone_number", ""),
+                )
+                for user, row in zip(users, rows)
+            ],
+            batch_size=500,
+        )
+        
+        return users
+
+
+class MoneyField(serializers.DecimalField):
+    """
+    DecimalField for 2-place money columns
+    Values loaded from the database already carry exactly two decimal places,
+    so they are printed as-is instead of being re-quantized on every row
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault("decimal_places", 2)
+        super().__init__(**kwargs)
+        self._plain_string_output = (
+            getattr(self, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+            and not self.localize
+            # normalize_output only exists from DRF 3.15
+            and not getattr(self, "normalize_output", False)
+        )
+
+    def to_representation(self, value):
+        if (self._plain_string_output and isinstance(value, Decimal)
+                and value.as_tuple().exponent == -self.decimal_places):
+            return str(value)
+        return super().to_representation(value)
+
 
 class RequestItemSerializer(serializers.ModelSerializer):
     """Serializer for request items"""
-    total_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    # Writable so updates can refer to existing items; ignored on create
+    id = serializers.UUIDField(required=False)
+    unit_price = MoneyField(max_digits=10, min_value=Decimal("0.01"))
+    total_price = MoneyField(max_digits=12, read_only=True)
     
     class Meta:
         model = RequestItem
         fields = ["id", "item_name", "description", "quantity", "unit_price", "total_price"]
-        read_only_fields = ["id", "total_price"]
+        read_only_fields = ["total_price"]
 
 
 class ApprovalSerializer(serializers.ModelSerializer):
@@ -103,6 +230,48 @@ class PurchaseRequestListSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "status", "created_by", "created_at", "updated_at"]
 
 
+class PurchaseRequestListRows:
+    """
+    Fast path for PurchaseRequestListSerializer.
+    Renders the same payload from `.values()` rows, skipping model instances
+    and the per-field serializer walk on high-traffic list endpoints
+    """
+    USER_FIELDS = ("id", "username", "email", "first_name", "last_name")
+    VALUE_FIELDS = (
+        "id", "title", "amount", "status", "created_at", "updated_at",
+        *(f"created_by__{field}" for field in USER_FIELDS),
+    )
+
+    _amount_field = MoneyField(max_digits=12)
+    _datetime_field = serializers.DateTimeField()
+    _status_labels = dict(RequestStatus.choices)
+
+    @classmethod
+    def values(cls, queryset):
+        """Project a request queryset onto the columns the list renders"""
+        return queryset.values(*cls.VALUE_FIELDS)
+
+    @classmethod
+    def to_representation(cls, row):
+        """Turn one `.values()` row into the list serializer's output shape"""
+        return {
+            "id": str(row["id"]),
+            "title": row["title"],
+            "amount": cls._amount_field.to_representation(row["amount"]),
+            "status": row["status"],
+            "status_display": cls._status_labels.get(row["status"], row["status"]),
+            "created_by": {
+                field: row[f"created_by__{field}"] for field in cls.USER_FIELDS
+            },
+            "created_at": cls._datetime_field.to_representation(row["created_at"]),
+            "updated_at": cls._datetime_field.to_representation(row["updated_at"]),
+        }
+
+    @classmethod
+    def many(cls, rows):
+        return [cls.to_representation(row) for row in rows]
+
+
 class PurchaseRequestDetailSerializer(serializers.ModelSerializer):
     """Detailed serializer for single request view"""
     created_by = UserMinimalSerializer(read_only=True)
@@ -134,6 +303,11 @@ class PurchaseRequestDetailSerializer(serializers.ModelSerializer):
         ]
 
 
+def _without_id(item_data):
+    """Item data minus any client-supplied id, which must not become a primary key"""
+    return {key: value for key, value in item_data.items() if key != "id"}
+
+
 class PurchaseRequestCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating purchase requests"""
     items = RequestItemSerializer(many=True, required=False)
@@ -148,14 +322,20 @@ class PurchaseRequestCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Amount must be greater than zero")
         return value
     
+    @transaction.atomic
     def create(self, validated_data):
         """Create request with items"""
         items_data = validated_data.pop("items", [])
         request = PurchaseRequest.objects.create(**validated_data)
         
         # Create items
-        for item_data in items_data:
-            RequestItem.objects.create(purchase_request=request, **item_data)
+        RequestItem.objects.bulk_create(
+            [
+                RequestItem(purchase_request=request, **_without_id(item_data))
+                for item_data in items_data
+            ],
+            batch_size=500,
+        )
         
         return request
 
@@ -175,8 +355,11 @@ class PurchaseRequestUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Only pending requests can be edited")
         return data
     
+    ITEM_FIELDS = ["item_name", "description", "quantity", "unit_price"]
+    
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Update request and replace items"""
+        """Update request and sync items"""
         items_data = validated_data.pop("items", None)
         
         # Update request fields
@@ -184,30 +367,64 @@ class PurchaseRequestUpdateSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.save()
         
-        # Replace items if provided
+        # Sync items if provided
         if items_data is not None:
-            instance.items.all().delete()
-            for item_data in items_data:
-                RequestItem.objects.create(purchase_request=instance, **item_data)
+            self._sync_items(instance, items_data)
         
         return instance
+    
+    def _sync_items(self, instance, items_data):
+        """
+        Make the request's items match `items_data`: entries with the id of an
+        existing item update it, other entries are inserted, and items missing
+        from the payload are deleted
+        """
+        existing = {item.id: item for item in instance.items.all()}
+        changed, new = [], []
+        
+        for item_data in items_data:
+            item = existing.pop(item_data.get("id"), None)
+            if item is None:
+                new.append(RequestItem(purchase_request=instance, **_without_id(item_data)))
+                continue
+            updates = {
+                field: item_data[field] for field in self.ITEM_FIELDS
+                if field in item_data and item_data[field] != getattr(item, field)
+            }
+            if updates:
+                for field, value in updates.items():
+                    setattr(item, field, value)
+                changed.append(item)
+        
+        # Whatever is left over was dropped by the client
+        if existing:
+            RequestItem.objects.filter(pk__in=existing).delete()
+        if changed:
+            RequestItem.objects.bulk_update(changed, self.ITEM_FIELDS, batch_size=500)
+        if new:
+            RequestItem.objects.bulk_create(new, batch_size=500)
 
 
 class ReceiptSubmissionSerializer(serializers.Serializer):
     """Serializer for receipt submission"""
     receipt = serializers.FileField(required=True)
     
+    ALLOWED_TYPES = {"application/pdf", "image/jpeg", "image/png"}
+    
     def validate_receipt(self, value):
         """Validate receipt file"""
-        # Check file size (10MB max)
-        if value.size > 10485760:
+        # Check file size (10MB max); MaxSizeUploadHandler already stops larger
+        # multipart uploads while streaming, this covers other parsers
+        if value.size > settings.MAX_UPLOAD_SIZE:
             raise serializers.ValidationError("Receipt file size must be less than 10MB")
         
-        # Check file type
-        allowed_types = ['application/pdf', 'image/jpeg', 'image/png', 'image/jpg']
-        if value.content_type not in allowed_types:
+        # Check file type from its leading bytes; the client-sent content type can lie
+        mime = sniff_content_type(value)
+        if mime not in self.ALLOWED_TYPES:
             raise serializers.ValidationError("Receipt must be PDF, JPEG, or PNG")
         
+        # Text extraction dispatches on content_type, so hand it the sniffed one
+        value.content_type = mime
         return value
 
 
@@ -0,0 +1,83 @@
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import UserProfile, PurchaseRequest, Approval, RequestStatus
+from .serializers import (
+    profile_cache_key, FINANCE_STATS_CACHE_KEY,
+    request_list_version_key, REQUEST_LIST_VERSION_TIMEOUT,
+)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_profile_cache(sender, instance, **kwargs):
+    """Drop the cached profile payload when the user changes"""
+    cache.delete(profile_cache_key(instance.pk))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_cache(sender, instance, **kwargs):
+    """Drop the cached profile payload when the profile changes"""
+    cache.delete(profile_cache_key(instance.user_id))
+
+
+def invalidate_finance_stats_cache():
+    """Drop the cached finance statistics once the current transaction commits"""
+    transaction.on_commit(lambda: cache.delete(FINANCE_STATS_CACHE_KEY))
+
+
+def get_request_list_version(scope):
+    """Current version of a request list scope, started on first use"""
+    key = request_list_version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, REQUEST_LIST_VERSION_TIMEOUT):
+            # Another request started it first
+            version = cache.get(key, version)
+    return version
+
+
+def touch_request_lists(created_by_id, *statuses):
+    """
+    Give every list scope showing a request (all requests, its creator's when
+    given and those of `statuses`) a new version once the current transaction
+    commits
+    Needed wherever requests are changed with .update(), which skips post_save
+    """
+    scopes = ["all", *(f"status:{status}" for status in statuses if status)]
+    if created_by_id is not None:
+        scopes.append(f"user:{created_by_id}")
+    transaction.on_commit(lambda: cache.set_many(
+        {request_list_version_key(scope): uuid.uuid4().hex for scope in scopes},
+        REQUEST_LIST_VERSION_TIMEOUT,
+    ))
+
+
+@receiver(post_save, sender=PurchaseRequest)
+@receiver(post_delete, sender=PurchaseRequest)
+def invalidate_request_caches(sender, instance, **kwargs):
+    """
+    Drop the cached finance statistics and list versions when a request changes
+    Deferred to commit so a concurrent read can't re-cache the old figures
+    """
+    invalidate_finance_stats_cache()
+    touch_request_lists(
+        instance.created_by_id, instance.status, getattr(instance, "_loaded_status", None)
+    )
+
+
+
+
+@receiver(post_save, sender=Approval)
+@receiver(post_delete, sender=Approval)
+def touch_approval_queues(sender, instance, **kwargs):
+    """
+    A decision moves a pending request between approver queues, so give the
+    lists those queues are served from new versions
+    """
+    touch_request_lists(None, RequestStatus.PENDING)
@@ -0,0 +1,77 @@
+"""
+Background tasks for document processing
+"""
+import logging
+
+from celery import shared_task
+from django.utils import timezone
+
+from .document_processing import process_proforma_upload, process_receipt_upload
+from .models import PurchaseRequest
+from .signals import touch_request_lists
+
+logger = logging.getLogger(__name__)
+
+# receipt_validation while the receipt is being checked in the background
+RECEIPT_VALIDATION_PENDING = {"status": "processing", "validated": False}
+
+
+@shared_task(ignore_result=True)
+def process_proforma_task(request_id):
+    """
+    Extract proforma metadata for a purchase request and store it
+    Writes only proforma_metadata, so concurrent edits to the request are kept
+    """
+    purchase_request = (
+        PurchaseRequest.objects.only("id", "proforma", "created_by_id", "status")
+        .filter(pk=request_id)
+        .first()
+    )
+    if purchase_request is None or not purchase_request.proforma:
+        return
+    
+    proforma = purchase_request.proforma
+    try:
+        metadata = process_proforma_upload(proforma)
+    finally:
+        proforma.close()
+    
+    PurchaseRequest.objects.filter(pk=request_id).update(
+        proforma_metadata=metadata,
+        updated_at=timezone.now()
+    )
+    touch_request_lists(purchase_request.created_by_id, purchase_request.status)
+
+
+@shared_task(ignore_result=True)
+def validate_receipt_task(request_id):
+    """
+    Validate the submitted receipt of a purchase request against its PO
+    Writes only receipt_validation; failures are stored instead of raised,
+    so a bad receipt never leaves the request stuck in "processing"
+    """
+    purchase_request = (
+        PurchaseRequest.objects.only("id", "receipt", "purchase_order_metadata", "created_by_id", "status")
+        .filter(pk=request_id)
+        .first()
+    )
+    if purchase_request is None or not purchase_request.receipt:
+        return
+    
+    receipt = purchase_request.receipt
+    try:
+        validation = process_receipt_upload(receipt, purchase_request.purchase_order_metadata or {})
+    except Exception as e:
+        logger.exception("Error validating receipt for request %s", request_id)
+        validation = {
+            "error": str(e),
+            "validated": False
+        }
+    finally:
+        receipt.close()
+    
+    PurchaseRequest.objects.filter(pk=request_id).update(
+        receipt_validation=validation,
+        updated_at=timezone.now()
+    )
+    touch_request_lists(purchase_request.created_by_id, purchase_request.status)
@@ -1,3 +1,498 @@
-from django.test import TestCase
+import csv
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework import serializers, status
+from rest_framework.test import APIClient
+
+from .models import Approval, PurchaseRequest, RequestItem, RequestStatus, UserProfile, UserRole
+from .serializers import RegisterSerializer
+from .tasks import RECEIPT_VALIDATION_PENDING
+from .views import ApproverRequestViewSet
+
+
+def registration(username, role=UserRole.STAFF):
+    """Registration payload for a user"""
+    return {
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": "Passw0rd!x",
+        "password_confirm": "Passw0rd!x",
+        "role": role,
+    }
+
+
+class BulkCreateUsersTests(TestCase):
+    def test_creates_users_and_profiles(self):
+        users = RegisterSerializer.bulk_create_users(
+            [registration("alice"), registration("bob", UserRole.FINANCE)]
+        )
+        
+        self.assertEqual([user.username for user in users], ["alice", "bob"])
+        self.assertTrue(User.objects.get(username="alice").check_password("Passw0rd!x"))
+        self.assertEqual(
+            UserProfile.objects.get(user__username="bob").role, UserRole.FINANCE
+        )
+
+    def test_rejects_duplicate_usernames_within_batch(self):
+        with self.assertRaises(serializers.ValidationError) as caught:
+            RegisterSerializer.bulk_create_users(
+                [registration("alice"), registration("bob"), registration("alice")]
+            )
+        
+        self.assertEqual(caught.exception.detail[0], {})
+        self.assertIn("username", caught.exception.detail[2])
+        self.assertFalse(User.objects.exists())
+
+    def test_rejects_existing_username(self):
+        User.objects.create_user(username="alice")
+        
+        with self.assertRaises(serializers.ValidationError):
+            RegisterSerializer.bulk_create_users([registration("alice")])
+        
+        self.assertEqual(User.objects.count(), 1)
+
+
+def make_client(username, role):
+    """API client authenticated as a new user with the given role"""
+    user = User.objects.create_user(username=username, password="Passw0rd!x")
+    UserProfile.objects.create(user=user, role=role)
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, user
+
+
+def make_request(user, title="Laptop", items=(("Laptop", 1, "900.00"),)):
+    """Pending purchase request of `user` with the given (name, quantity, unit price) items"""
+    purchase_request = PurchaseRequest.objects.create(
+        title=title, description="For work", amount=Decimal("900.00"), created_by=user
+    )
+    RequestItem.objects.bulk_create([
+        RequestItem(purchase_request=purchase_request, item_name=name, quantity=quantity, unit_price=Decimal(price))
+        for name, quantity, price in items
+    ])
+    return purchase_request
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        # Profile and statistics payloads are cached across requests
+        cache.clear()
+        self.staff, self.staff_user = make_client("staff", UserRole.STAFF)
+        self.approver_1, self.approver_1_user = make_client("approver1", UserRole.APPROVER_L1)
+        self.approver_2, self.approver_2_user = make_client("approver2", UserRole.APPROVER_L2)
+
+
+class ItemSyncTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.purchase_request = make_request(
+            self.staff_user, items=(("Laptop", 1, "900.00"), ("Mouse", 2, "10.00"))
+        )
+        self.laptop = self.purchase_request.items.get(item_name="Laptop")
+        self.mouse = self.purchase_request.items.get(item_name="Mouse")
+        self.url = f"/api/requests/{self.purchase_request.pk}/"
+
+    def test_updates_inserts_and_deletes_items(self):
+        response = self.staff.patch(self.url, {"items": [
+            {"id": str(self.laptop.pk), "item_name": "Laptop", "quantity": 2, "unit_price": "900.00"},
+            {"item_name": "Dock", "quantity": 1, "unit_price": "150.00"},
+        ]}, format="json")
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items = {item.item_name: item for item in self.purchase_request.items.all()}
+        self.assertEqual(set(items), {"Laptop", "Dock"})
+        # Updated in place, with the total recalculated
+        self.assertEqual(items["Laptop"].pk, self.laptop.pk)
+        self.assertEqual(items["Laptop"].total_price, Decimal("1800.00"))
+        self.assertEqual(items["Dock"].total_price, Decimal("150.00"))
+        self.assertFalse(RequestItem.objects.filter(pk=self.mouse.pk).exists())
+
+    def test_leaves_items_alone_without_items_payload(self):
+        response = self.staff.patch(self.url, {"title": "New laptop"}, format="json")
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.purchase_request.items.count(), 2)
+
+    def test_id_of_another_requests_item_is_inserted_as_new(self):
+        other_request = make_request(self.staff_user, title="Other", items=(("Chair", 1, "80.00"),))
+        chair = other_request.items.get()
+        
+        response = self.staff.patch(self.url, {"items": [
+            {"id": str(chair.pk), "item_name": "Desk", "quantity": 1, "unit_price": "300.00"},
+        ]}, format="json")
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        desk = self.purchase_request.items.get()
+        self.assertEqual(desk.item_name, "Desk")
+        self.assertNotEqual(desk.pk, chair.pk)
+        chair.refresh_from_db()
+        self.assertEqual((chair.purchase_request_id, chair.item_name), (other_request.pk, "Chair"))
+
+
+class FinanceExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.finance, _ = make_client("finance", UserRole.FINANCE)
+
+    def export(self, **params):
+        response = self.finance.get("/api/finance/export/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        return list(csv.reader(lines))
+
+    def test_exports_approved_requests_by_default(self):
+        approved = make_request(self.staff_user, title="Approved")
+        PurchaseRequest.objects.filter(pk=approved.pk).update(status=RequestStatus.APPROVED)
+        make_request(self.staff_user, title="Pending")
+        
+        header, *rows = self.export()
+        
+        self.assertEqual(header[:2], ["id", "title"])
+        self.assertEqual([row[1] for row in rows], ["Approved"])
+        self.assertEqual(len(self.export(status=RequestStatus.PENDING)), 2)
+
+    def test_neutralises_formulas(self):
+        for title in ('=HYPERLINK("x")', "+1", "-1", "@SUM(A1)", "\tTab", "Plain"):
+            purchase_request = make_request(self.staff_user, title=title)
+            PurchaseRequest.objects.filter(pk=purchase_request.pk).update(status=RequestStatus.APPROVED)
+        
+        titles = sorted(row[1] for row in self.export()[1:])
+        
+        self.assertEqual(titles, sorted([
+            '\'=HYPERLINK("x")', "'+1", "'-1", "'@SUM(A1)", "'\tTab", "Plain",
+        ]))
+
+
+class CursorPaginationTests(APITestCase):
+    def test_pages_follow_next_links(self):
+        for number in range(25):
+            make_request(self.staff_user, title=f"Request {number}")
+        
+        response = self.staff.get("/api/requests/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        self.assertIsNone(response.data["previous"])
+        first_page = [row["title"] for row in response.data["results"]]
+        
+        response = self.staff.get(response.data["next"])
+        second_page = [row["title"] for row in response.data["results"]]
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(len(first_page), 20)
+        self.assertEqual(sorted(first_page + second_page), sorted(f"Request {number}" for number in range(25)))
+
+
+class ApprovalTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.purchase_request = make_request(self.staff_user)
+
+    def approve(self, client, approved=True):
+        return client.post(
+            f"/api/approvals/{self.purchase_request.pk}/approve/",
+            {"approved": approved, "comments": "" if approved else "Over budget"},
+            format="json",
+        )
+
+    def test_two_level_approval(self):
+        self.assertEqual(self.approve(self.approver_1).status_code, status.HTTP_200_OK)
+        response = self.approve(self.approver_2)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], RequestStatus.APPROVED)
+        self.assertTrue(response.data["is_fully_approved"])
+        self.assertEqual(len(response.data["approvals"]), 2)
+
+    def test_level_2_requires_level_1(self):
+        response = self.approve(self.approver_2)
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Approval.objects.exists())
+
+    def test_reject_with_form_encoded_body(self):
+        # request.data is an immutable QueryDict here, which reject must not modify
+        response = self.approver_1.post(
+            f"/api/approvals/{self.purchase_request.pk}/reject/",
+            urlencode({"comments": "Over budget"}),
+            content_type="application/x-www-form-urlencoded",
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], RequestStatus.REJECTED)
+        approval = Approval.objects.get()
+        self.assertEqual((approval.approved, approval.comments), (False, "Over budget"))
+
+    def test_decision_losing_a_race_is_rolled_back(self):
+        get_object = ApproverRequestViewSet.get_object
+        
+        def get_object_then_reject_elsewhere(view):
+            # Another decision lands between loading the request and deciding
+            purchase_request = get_object(view)
+            PurchaseRequest.objects.filter(pk=purchase_request.pk).update(status=RequestStatus.REJECTED)
+            return purchase_request
+        
+        with mock.patch.object(ApproverRequestViewSet, "get_object", get_object_then_reject_elsewhere):
+            response = self.approve(self.approver_1, approved=False)
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {"error": "Can only approve pending requests"})
+        self.assertFalse(Approval.objects.exists())
+        self.purchase_request.refresh_from_db()
+        self.assertIsNone(self.purchase_request.rejected_at)
+
+
+class ConditionalListTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.purchase_request = make_request(self.staff_user)
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.staff.get("/api/requests/")
+        etag = response["ETag"]
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Whole-second Last-Modified could hide edits, the ETag is the validator
+        self.assertNotIn("Last-Modified", response)
+        response = self.staff.get("/api/requests/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_decision_changes_approver_lists(self):
+        etag = self.approver_2.get("/api/approvals/")["ETag"]
+        
+        # A level 1 approval keeps the request pending but puts it in the level 2 queue
+        with self.captureOnCommitCallbacks(execute=True):
+            self.approver_1.post(
+                f"/api/approvals/{self.purchase_request.pk}/approve/", {"approved": True}, format="json"
+            )
+        
+        response = self.approver_2.get("/api/approvals/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["id"] for row in response.data["results"]], [str(self.purchase_request.pk)])
+
+    def test_edit_changes_own_list(self):
+        etag = self.staff.get("/api/requests/")["ETag"]
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.patch(
+                f"/api/requests/{self.purchase_request.pk}/", {"title": "New laptop"}, format="json"
+            )
+        
+        response = self.staff.get("/api/requests/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["title"], "New laptop")
+
+    def test_pending_edit_keeps_finance_list(self):
+        finance, _ = make_client("finance", UserRole.FINANCE)
+        etag = finance.get("/api/finance/")["ETag"]
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.patch(
+                f"/api/requests/{self.purchase_request.pk}/", {"title": "New laptop"}, format="json"
+            )
+        
+        # Finance lists approved requests by default, which this edit can't change
+        response = finance.get("/api/finance/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_final_approval_changes_finance_list(self):
+        finance, _ = make_client("finance", UserRole.FINANCE)
+        etag = finance.get("/api/finance/")["ETag"]
+        
+        url = f"/api/approvals/{self.purchase_request.pk}/approve/"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.approver_1.post(url, {"approved": True}, format="json")
+        self.assertEqual(finance.get("/api/finance/", HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.approver_2.post(url, {"approved": True}, format="json")
+        
+        response = finance.get("/api/finance/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["id"] for row in response.data["results"]], [str(self.purchase_request.pk)])
+
+    def test_etag_is_per_user(self):
+        etag = self.approver_1.get("/api/approvals/")["ETag"]
+        
+        response = self.approver_2.get("/api/approvals/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        RegisterSerializer.bulk_create_users([registration("alice")])
+        self.client = APIClient()
+
+    def test_returns_user_and_tokens(self):
+        response = self.client.post(
+            "/api/auth/login/", {"username": "alice", "password": "Passw0rd!x"}, format="json"
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["user"]["username"], "alice")
+        self.assertEqual(response.data["user"]["profile"]["role"], UserRole.STAFF)
+        self.assertEqual(set(response.data["tokens"]), {"refresh", "access"})
+
+    def test_wrong_password_is_unauthorized(self):
+        response = self.client.post(
+            "/api/auth/login/", {"username": "alice", "password": "wrong"}, format="json"
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data, {"error": "Invalid credentials"})
+
+    def test_missing_password_is_bad_request(self):
+        response = self.client.post("/api/auth/login/", {"username": "alice"}, format="json")
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {"error": "Username and password are required"})
+
+
+
+def png_upload(name="receipt.png"):
+    """Small PNG image upload"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (10, 10), "white").save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class ReceiptSubmissionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        
+        self.purchase_request = make_request(self.staff_user)
+        PurchaseRequest.objects.filter(pk=self.purchase_request.pk).update(status=RequestStatus.APPROVED)
+        self.url = f"/api/requests/{self.purchase_request.pk}/submit-receipt/"
+
+    @mock.patch("purchase_requests.tasks.process_receipt_upload")
+    def test_validates_against_po_in_background(self, process_receipt_upload):
+        PurchaseRequest.objects.filter(pk=self.purchase_request.pk).update(
+            purchase_order_metadata={"po_number": "PO-1"}
+        )
+        process_receipt_upload.return_value = {"validated": True, "discrepancies": []}
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.staff.post(self.url, {"receipt": png_upload()}, format="multipart")
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["receipt_validation"], RECEIPT_VALIDATION_PENDING)
+        receipt, po_metadata = process_receipt_upload.call_args.args
+        self.assertEqual(po_metadata, {"po_number": "PO-1"})
+        self.purchase_request.refresh_from_db()
+        self.assertEqual(self.purchase_request.receipt_validation, {"validated": True, "discrepancies": []})
+
+    @mock.patch("purchase_requests.tasks.process_receipt_upload")
+    def test_without_po_stores_receipt_only(self, process_receipt_upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.staff.post(self.url, {"receipt": png_upload()}, format="multipart")
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        process_receipt_upload.assert_not_called()
+        self.purchase_request.refresh_from_db()
+        self.assertTrue(self.purchase_request.receipt)
+        self.assertIsNone(self.purchase_request.receipt_validation)
+
+    def test_rejects_non_image_content_whatever_its_name(self):
+        upload = SimpleUploadedFile("receipt.png", b"just text", content_type="image/png")
+        
+        response = self.staff.post(self.url, {"receipt": upload}, format="multipart")
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("receipt", response.data)
+
+    @mock.patch("purchase_requests.file_types.magic", None)
+    def test_recognises_accepted_types_without_libmagic(self):
+        response = self.staff.post(self.url, {"receipt": png_upload("receipt")}, format="multipart")
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        upload = SimpleUploadedFile("receipt.png", b"just text", content_type="image/png")
+        response = self.staff.post(self.url, {"receipt": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(MAX_UPLOAD_SIZE=1024)
+    def test_oversized_upload_is_json_413(self):
+        upload = SimpleUploadedFile("receipt.png", b"\x89PNG" + b"0" * 4096, content_type="image/png")
+        
+        response = self.staff.post(self.url, {"receipt": upload}, format="multipart")
+        
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("error", response.json())
+        self.purchase_request.refresh_from_db()
+        self.assertFalse(self.purchase_request.receipt)
+
+
+class ProfileCacheTests(APITestCase):
+    def test_profile_changes_show_up(self):
+        self.assertEqual(self.staff.get("/api/auth/profile/").data["profile"]["department"], "")
+        
+        profile = self.staff_user.profile
+        profile.department = "IT"
+        profile.save()
+        self.staff_user.first_name = "Sam"
+        self.staff_user.save()
+        
+        data = self.staff.get("/api/auth/profile/").data
+        self.assertEqual(data["profile"]["department"], "IT")
+        self.assertEqual(data["first_name"], "Sam")
+
+    def test_served_from_cache(self):
+        self.staff.get("/api/auth/profile/")
+        
+        with self.assertNumQueries(0):
+            response = self.staff.get("/api/auth/profile/")
+        self.assertEqual(response.data["username"], "staff")
+
+
+class FinanceStatisticsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.finance, _ = make_client("finance", UserRole.FINANCE)
+        self.purchase_request = make_request(self.staff_user)
+
+    def statistics(self):
+        response = self.finance.get("/api/finance/statistics/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_final_approval_refreshes_cached_statistics(self):
+        self.assertEqual(self.statistics()["total_requests"], 0)
+        
+        url = f"/api/approvals/{self.purchase_request.pk}/approve/"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.approver_1.post(url, {"approved": True}, format="json")
+            self.approver_2.post(url, {"approved": True}, format="json")
+        
+        stats = self.statistics()
+        self.assertEqual(stats["total_requests"], 1)
+        self.assertEqual(stats["total_amount"], Decimal("900.00"))
+
+    def test_saved_request_refreshes_cached_statistics(self):
+        self.assertEqual(self.statistics()["total_requests"], 0)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.purchase_request.status = RequestStatus.APPROVED
+            self.purchase_request.save()
+        
+        self.assertEqual(self.statistics()["total_requests"], 1)
+
+    def test_served_from_cache(self):
+        self.statistics()
+        
+        with self.assertNumQueries(0):
+            self.statistics()
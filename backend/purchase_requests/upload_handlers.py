@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """
+    Abort an upload as soon as one file grows past MAX_UPLOAD_SIZE.
+    Runs ahead of Django's memory/temporary-file handlers, so oversize files
+    are rejected while streaming instead of being spooled to disk first
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.MAX_UPLOAD_SIZE:
+            # Answered with a JSON 413 by purchase_requests.exceptions
+            raise RequestDataTooBig(
+                f"Uploaded file size must be less than {settings.MAX_UPLOAD_SIZE // (1024 * 1024)}MB"
+            )
+        return raw_data
+
+    def file_complete(self, file_size):
+        # Let the next handler build the file object
+        return None
@@ -1,12 +1,12 @@
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from rest_framework.routers import SimpleRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 from . import views
 
 app_name = "purchase_requests"
 
 # Router for viewsets
-router = DefaultRouter()
+router = SimpleRouter()
 router.register(r'requests', views.StaffRequestViewSet, basename='staff-request')
 router.register(r'approvals', views.ApproverRequestViewSet, basename='approver-request')
 router.register(r'finance', views.FinanceRequestViewSet, basename='finance-request')
@@ -1,19 +1,115 @@
+import csv
+import logging
+from decimal import Decimal
+from functools import wraps
 from rest_framework import status, generics, viewsets
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Exists, OuterRef, Q, Sum, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from .serializers import (
-    RegisterSerializer, UserSerializer,
-    PurchaseRequestListSerializer, PurchaseRequestDetailSerializer,
+    RegisterSerializer, LoginSerializer, PROFILE_CACHE_TIMEOUT, profile_cache_key,
+    FINANCE_STATS_CACHE_KEY, FINANCE_STATS_CACHE_TIMEOUT,
+    PurchaseRequestListSerializer, PurchaseRequestListRows, PurchaseRequestDetailSerializer,
     PurchaseRequestCreateSerializer, PurchaseRequestUpdateSerializer,
-    ReceiptSubmissionSerializer
+    ReceiptSubmissionSerializer, ApprovalActionSerializer
 )
-from .models import PurchaseRequest, RequestStatus
-from .permissions import IsStaff, IsAnyApprover, IsFinance, CanEditRequest
-from .document_processing import process_proforma_upload, process_receipt_upload
+from .models import PurchaseRequest, Approval, RequestStatus, UserRole
+from .document_processing import generate_purchase_order
+from .pagination import RequestCursorPagination
+from .permissions import IsStaff, IsAnyApprover, IsFinance, CanEditRequest, get_cached_profile
+from .signals import invalidate_finance_stats_cache, get_request_list_version, touch_request_lists
+from .tasks import process_proforma_task, validate_receipt_task, RECEIPT_VALIDATION_PENDING
+
+logger = logging.getLogger(__name__)
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, for streaming csv.writer"""
+    def write(self, value):
+        return value
+
+
+# Leading characters that make spreadsheet apps read a CSV cell as a formula
+_CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_safe(value):
+    """
+    Neutralise user-entered text that a spreadsheet would run as a formula
+    (CSV injection) by prefixing it with a quote; other values pass as-is
+    """
+    if isinstance(value, str) and value.startswith(_CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _conditional_list(list_method):
+    """
+    Answer list polls with 304 Not Modified while nothing they show changed.
+    The ETag is the cached version of self.list_scope(), the list scope
+    covering the endpoint (see touch_request_lists()), so a poll costs no
+    query. It also carries the user, as approver queues differ per role.
+    No Last-Modified is sent: its whole-second precision would hide a second
+    edit made within the same second.
+    """
+    @wraps(list_method)
+    def list(self, request, *args, **kwargs):
+        scope = self.list_scope()
+        etag = quote_etag(f"{request.user.pk}-{scope}-{get_request_list_version(scope)}")
+        
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = list_method(self, request, *args, **kwargs)
+        
+        response.headers['ETag'] = etag
+        # Cacheable per user only, and always revalidated
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return list
+
+
+def _user_payload(user):
+    """
+    UserSerializer output built straight from the user and its profile,
+    for auth responses where the serializer walk is pure overhead
+    """
+    profile = getattr(user, "profile", None)
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "profile": {
+            "role": profile.role,
+            "department": profile.department,
+            "phone_number": profile.phone_number,
+        } if profile is not None else None,
+    }
+
+
+def _cached_user_payload(user):
+    """
+    _user_payload() through the per-user profile cache, which the user and
+    profile save signals keep current
+    """
+    key = profile_cache_key(user.pk)
+    data = cache.get(key)
+    if data is None:
+        data = _user_payload(user)
+        cache.set(key, data, PROFILE_CACHE_TIMEOUT)
+    return data
 
 
 class RegisterView(generics.CreateAPIView):
@@ -24,13 +120,14 @@ class RegisterView(generics.CreateAPIView):
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
         
-        # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        # User, profile and the outstanding refresh token commit together
+        with transaction.atomic():
+            user = serializer.save()
+            refresh = RefreshToken.for_user(user)
         
         return Response({
-            "user": UserSerializer(user).data,
+            "user": _user_payload(user),
             "tokens": {
                 "refresh": str(refresh),
                 "access": str(refresh.access_token),
@@ -42,32 +139,25 @@ class RegisterView(generics.CreateAPIView):
 @permission_classes([AllowAny])
 def login_view(request):
     """User login endpoint"""
-    username = request.data.get("username")
-    password = request.data.get("password")
-    
-    if not username or not password:
-        return Response(
-            {"error": "Username and password are required"},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    user = authenticate(username=username, password=password)
+    serializer = LoginSerializer(data=request.data, context={"request": request})
     
-    if user is None:
+    try:
+        valid = serializer.is_valid()
+    except AuthenticationFailed:
         return Response(
             {"error": "Invalid credentials"},
             status=status.HTTP_401_UNAUTHORIZED
         )
     
-    # Generate tokens
-    refresh = RefreshToken.for_user(user)
+    if not valid:
+        return Response(
+            {"error": "Username and password are required"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     return Response({
-        "user": UserSerializer(user).data,
-        "tokens": {
-            "refresh": str(refresh),
-            "access": str(refresh.access_token),
-        }
+        "user": _cached_user_payload(serializer.user),
+        **serializer.validated_data,
     })
 
 
@@ -75,21 +165,20 @@ def login_view(request):
 @permission_classes([IsAuthenticated])
 def profile_view(request):
     """Get current user profile"""
-    return Response(UserSerializer(request.user).data)
+    return Response(_cached_user_payload(request.user))
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def logout_view(request):
     """Logout user by blacklisting refresh token"""
-    try:
-        refresh_token = request.data.get("refresh")
-        if refresh_token:
-            token = RefreshToken(refresh_token)
-            token.blacklist()
-        return Response({"message": "Logout successful"}, status=status.HTTP_200_OK)
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    refresh_token = request.data.get("refresh")
+    if refresh_token:
+        try:
+            RefreshToken(refresh_token).blacklist()
+        except TokenError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"message": "Logout successful"}, status=status.HTTP_200_OK)
 
 
 # ==================== STAFF ENDPOINTS ====================
@@ -105,12 +194,30 @@ class StaffRequestViewSet(viewsets.ModelViewSet):
     - Submit receipts
     """
     permission_classes = [IsAuthenticated, IsStaff]
+    pagination_class = RequestCursorPagination
+    # Requests can't be deleted; DRF answers DELETE with 405 before any lookup
+    http_method_names = ['get', 'post', 'put', 'patch', 'head', 'options']
     
     def get_queryset(self):
         """Staff can only see their own requests"""
-        return PurchaseRequest.objects.filter(
-            created_by=self.request.user
-        ).prefetch_related('items', 'approvals', 'approvals__approver')
+        queryset = PurchaseRequest.objects.filter(created_by=self.request.user)
+        if self.action == 'list':
+            # The list serializer renders neither items, approvals nor metadata
+            return queryset.list_view()
+        return queryset.with_detail_relations()
+    
+    def list_scope(self):
+        """List scope of the user's own requests"""
+        return f"user:{self.request.user.pk}"
+    
+    @_conditional_list
+    def list(self, request, *args, **kwargs):
+        """List own requests from plain `.values()` rows"""
+        rows = PurchaseRequestListRows.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(PurchaseRequestListRows.many(page))
+        return Response(PurchaseRequestListRows.many(rows))
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -123,21 +230,30 @@ class StaffRequestViewSet(viewsets.ModelViewSet):
         return PurchaseRequestDetailSerializer
     
     def perform_create(self, serializer):
-        """Set created_by to current user and process proforma if uploaded"""
+        """Set created_by to current user and queue proforma processing if uploaded"""
         instance = serializer.save(created_by=self.request.user)
         
-        # Process proforma if uploaded
+        # Process proforma in the background once the request is committed
         if instance.proforma:
-            try:
-                metadata = process_proforma_upload(instance.proforma)
-                instance.proforma_metadata = metadata
-                instance.save()
-            except Exception as e:
-                # Log error but don't fail the request creation
-                print(f"Error processing proforma: {e}")
+            request_id = str(instance.pk)
+            transaction.on_commit(lambda: process_proforma_task.delay(request_id))
+    
+    def perform_update(self, serializer):
+        """Save edits and re-process the proforma when a new one was uploaded"""
+        instance = serializer.save()
+        
+        if 'proforma' in serializer.validated_data and instance.proforma:
+            request_id = str(instance.pk)
+            transaction.on_commit(lambda: process_proforma_task.delay(request_id))
+    
+    def get_object(self):
+        """Load the request once; update() and DRF's own update both ask for it"""
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
     
     def update(self, request, *args, **kwargs):
-        """Only allow updating pending requests"""
+        """Only allow updating pending requests (partial_update goes through here too)"""
         instance = self.get_object()
         if not instance.can_be_edited_by(request.user):
             return Response(
@@ -146,23 +262,6 @@ class StaffRequestViewSet(viewsets.ModelViewSet):
             )
         return super().update(request, *args, **kwargs)
     
-    def partial_update(self, request, *args, **kwargs):
-        """Only allow partial updating pending requests"""
-        instance = self.get_object()
-        if not instance.can_be_edited_by(request.user):
-            return Response(
-                {"error": "You can only edit your own pending requests"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        return super().partial_update(request, *args, **kwargs)
-    
-    def destroy(self, request, *args, **kwargs):
-        """Prevent deletion, return 405 Method Not Allowed"""
-        return Response(
-            {"error": "Deletion of requests is not allowed"},
-            status=status.HTTP_405_METHOD_NOT_ALLOWED
-        )
-    
     @action(detail=True, methods=['post'], url_path='submit-receipt')
     def submit_receipt(self, request, pk=None):
         """
@@ -184,28 +283,19 @@ class StaffRequestViewSet(viewsets.ModelViewSet):
         
         purchase_request.receipt = serializer.validated_data['receipt']
         
-        # Process and validate receipt against PO
-        try:
-            po_metadata = purchase_request.purchase_order_metadata or {}
-            if po_metadata:
-                validation_results = process_receipt_upload(
-                    purchase_request.receipt,
-                    po_metadata
-                )
-                purchase_request.receipt_validation = validation_results
-        except Exception as e:
-            # Log error but don't fail receipt submission
-            print(f"Error validating receipt: {e}")
-            purchase_request.receipt_validation = {
-                "error": str(e),
-                "validated": False
-            }
+        # Validate the receipt against the PO in the background once it is stored
+        validate = bool(purchase_request.purchase_order_metadata)
+        if validate:
+            purchase_request.receipt_validation = RECEIPT_VALIDATION_PENDING
+        purchase_request.save(update_fields=['receipt', 'receipt_validation', 'updated_at'])
         
-        purchase_request.save()
+        if validate:
+            request_id = str(purchase_request.pk)
+            transaction.on_commit(lambda: validate_receipt_task.delay(request_id))
         
         return Response(
             PurchaseRequestDetailSerializer(purchase_request).data,
-            status=status.HTTP_200_OK
+            status=status.HTTP_202_ACCEPTED if validate else status.HTTP_200_OK
         )
 
 
@@ -221,15 +311,33 @@ class ApproverRequestViewSet(viewsets.ReadOnlyModelViewSet):
     - Approve or reject requests at their level
     """
     permission_classes = [IsAuthenticated, IsAnyApprover]
+    pagination_class = RequestCursorPagination
+    
+    # Approval level each approver role decides at
+    APPROVER_LEVEL_BY_ROLE = {
+        UserRole.APPROVER_L1: 1,
+        UserRole.APPROVER_L2: 2,
+    }
+    
+    # What each approver level still has to act on
+    NEEDS_ATTENTION_BY_ROLE = {
+        # Pending requests without a level 1 decision
+        UserRole.APPROVER_L1: Q(status=RequestStatus.PENDING, has_l1_decision=False),
+        # Pending requests approved at level 1 but without a level 2 decision
+        UserRole.APPROVER_L2: Q(
+            status=RequestStatus.PENDING, l1_approved=True, has_l2_decision=False
+        ),
+    }
     
     def get_queryset(self):
         """
         Approvers can see all requests, but filtered by what needs their attention
         """
-        user = self.request.user
-        queryset = PurchaseRequest.objects.all().prefetch_related(
-            'items', 'approvals', 'approvals__approver'
-        )
+        if self.action == 'list':
+            # The list serializer renders neither items, approvals nor metadata
+            queryset = PurchaseRequest.objects.list_view()
+        else:
+            queryset = PurchaseRequest.objects.with_detail_relations()
         
         # Filter by status if requested
         status_filter = self.request.query_params.get('status', None)
@@ -240,27 +348,40 @@ class ApproverRequestViewSet(viewsets.ReadOnlyModelViewSet):
         if self.action == 'list':
             needs_attention = self.request.query_params.get('needs_attention', 'true')
             if needs_attention.lower() == 'true':
-                if hasattr(user, 'profile'):
-                    if user.profile.role == 'approver_level_1':
-                        # Show pending requests without level 1 approval
-                        queryset = queryset.filter(
-                            status=RequestStatus.PENDING
-                        ).exclude(
-                            approvals__approver_level=1,
-                            approvals__approved__isnull=False
-                        )
-                    elif user.profile.role == 'approver_level_2':
-                        # Show pending requests with level 1 approval but without level 2
-                        queryset = queryset.filter(
-                            status=RequestStatus.PENDING,
-                            approvals__approver_level=1,
-                            approvals__approved=True
-                        ).exclude(
-                            approvals__approver_level=2,
-                            approvals__approved__isnull=False
-                        )
-        
-        return queryset.distinct()
+                profile = get_cached_profile(self.request)
+                attention = self.NEEDS_ATTENTION_BY_ROLE.get(profile.role) if profile else None
+                if attention is not None:
+                    # Correlated EXISTS probes instead of joins, so no row
+                    # duplication and no DISTINCT is needed; alias() keeps
+                    # them out of the SELECT list
+                    approvals = Approval.objects.filter(purchase_request=OuterRef('pk'))
+                    reviewed = approvals.filter(approved__isnull=False)
+                    queryset = queryset.alias(
+                        has_l1_decision=Exists(reviewed.filter(approver_level=1)),
+                        l1_approved=Exists(approvals.filter(approver_level=1, approved=True)),
+                        has_l2_decision=Exists(reviewed.filter(approver_level=2)),
+                    ).filter(attention)
+        
+        return queryset
+    
+    def list_scope(self):
+        """
+        List scope covering the list: the status asked for, pending requests
+        for the needs-attention queue (the default), otherwise all requests
+        """
+        status_filter = self.request.query_params.get('status', None)
+        if status_filter in RequestStatus.values:
+            return f"status:{status_filter}"
+        if status_filter:
+            return "all"
+        if self.request.query_params.get('needs_attention', 'true').lower() == 'true':
+            return f"status:{RequestStatus.PENDING}"
+        return "all"
+    
+    @_conditional_list
+    def list(self, request, *args, **kwargs):
+        """List requests, or 304 while none changed since the client's copy"""
+        return super().list(request, *args, **kwargs)
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -274,11 +395,24 @@ class ApproverRequestViewSet(viewsets.ReadOnlyModelViewSet):
         Approve a purchase request at the approver's level
         POST /api/approvals/{id}/approve/
         """
-        from .serializers import ApprovalActionSerializer
-        from .models import Approval, UserRole
-        from django.utils import timezone
-        from django.db import transaction
-        
+        return self._apply_approval(request, request.data)
+    
+    @action(detail=True, methods=['post'], url_path='reject')
+    def reject_request(self, request, pk=None):
+        """
+        Reject a purchase request at the approver's level
+        POST /api/approvals/{id}/reject/
+        """
+        return self._apply_approval(request, {
+            'approved': False,
+            'comments': request.data.get('comments', ''),
+        })
+    
+    def _apply_approval(self, request, data):
+        """
+        Record the requesting approver's decision (`data` is validated with
+        ApprovalActionSerializer) and move the request to its next status
+        """
         purchase_request = self.get_object()
         user = request.user
         
@@ -290,7 +424,7 @@ class ApproverRequestViewSet(viewsets.ReadOnlyModelViewSet):
             )
         
         # Validate serializer
-        serializer = ApprovalActionSerializer(data=request.data)
+        serializer = ApprovalActionSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         
         approved = serializer.validated_data['approved']
@@ -303,21 +437,23 @@ class ApproverRequestViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        if user.profile.role == UserRole.APPROVER_L1:
-            approver_level = 1
-        elif user.profile.role == UserRole.APPROVER_L2:
-            approver_level = 2
-        else:
+        approver_level = self.APPROVER_LEVEL_BY_ROLE.get(user.profile.role)
+        if approver_level is None:
             return Response(
                 {"error": "User is not an approver"},
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        # Approvals come with the request's prefetch, so these checks are free
+        approvals_by_level = {
+            approval.approver_level: approval
+            for approval in purchase_request.approvals.all()
+        }
+        level_1_approval = approvals_by_level.get(1)
+        level_1_approved = level_1_approval is not None and level_1_approval.approved is True
+        
         # Check if already approved/rejected at this level
-        existing_approval = Approval.objects.filter(
-            purchase_request=purchase_request,
-            approver_level=approver_level
-        ).first()
+        existing_approval = approvals_by_level.get(approver_level)
         
         if existing_approval and existing_approval.approved is not None:
             return Response(
@@ -327,13 +463,7 @@ class ApproverRequestViewSet(viewsets.ReadOnlyModelViewSet):
         
         # For level 2, ensure level 1 is approved
         if approver_level == 2:
-            level_1_approval = Approval.objects.filter(
-                purchase_request=purchase_request,
-                approver_level=1,
-                approved=True
-            ).first()
-            
-            if not level_1_approval:
+            if not level_1_approved:
                 return Response(
                     {"error": "Level 1 approval is required before Level 2 can approve"},
                     status=status.HTTP_400_BAD_REQUEST
@@ -345,7 +475,7 @@ class ApproverRequestViewSet(viewsets.ReadOnlyModelViewSet):
                 existing_approval.approved = approved
                 existing_approval.comments = comments
                 existing_approval.reviewed_at = timezone.now()
-                existing_approval.save()
+                existing_approval.save(update_fields=['approved', 'comments', 'reviewed_at', 'updated_at'])
             else:
                 Approval.objects.create(
                     purchase_request=purchase_request,
@@ -357,73 +487,83 @@ class ApproverRequestViewSet(viewsets.ReadOnlyModelViewSet):
                 )
             
             # Update request status based on approval outcome
+            now = timezone.now()
             if not approved:
                 # Rejection at any level → request rejected
-                purchase_request.status = RequestStatus.REJECTED
-                purchase_request.rejected_at = timezone.now()
-                purchase_request.save()
+                transition = {'status': RequestStatus.REJECTED, 'rejected_at': now}
+            elif approver_level == 2 and level_1_approved:
+                # Level 2 approved on top of level 1 → fully approved
+                transition = {'status': RequestStatus.APPROVED, 'approved_at': now}
             else:
-                # Check if fully approved (both levels approved)
-                if approver_level == 2:
-                    # Level 2 just approved, check if level 1 is also approved
-                    level_1_approved = Approval.objects.filter(
-                        purchase_request=purchase_request,
-                        approver_level=1,
-                        approved=True
-                    ).exists()
-                    
-                    if level_1_approved:
-                        purchase_request.status = RequestStatus.APPROVED
-                        purchase_request.approved_at = timezone.now()
-                        purchase_request.save()
-                        
-                        # Trigger automatic PO generation
-                        try:
-                            from .document_processing import generate_purchase_order
-                            
-                            # Prepare request data
-                            request_data = {
-                                'title': purchase_request.title,
-                                'description': purchase_request.description,
-                                'amount': str(purchase_request.amount),
-                                'items': [
-                                    {
-                                        'name': item.item_name,
-                                        'description': item.description,
-                                        'quantity': item.quantity,
-                                        'unit_price': str(item.unit_price),
-                                        'total': str(item.total_price)
-                                    }
-                                    for item in purchase_request.items.all()
-                                ]
-                            }
-                            
-                            # Generate PO using proforma metadata
-                            proforma_metadata = purchase_request.proforma_metadata or {}
-                            po_data = generate_purchase_order(request_data, proforma_metadata)
-                            
-                            if po_data.get('generated'):
-                                purchase_request.purchase_order_metadata = po_data
-                                purchase_request.save()
-                                
-                        except Exception as e:
-                            # Log error but don't fail the approval
-                            print(f"Error generating PO: {e}")
-        
+                transition = None
+            
+            if transition:
+                # Compare-and-set: only a still-pending request moves on, so two
+                # concurrent decisions can't both win
+                updated = PurchaseRequest.objects.filter(
+                    pk=purchase_request.pk, status=RequestStatus.PENDING
+                ).update(updated_at=now, **transition)
+                if not updated:
+                    # Another decision got there first; drop this approval too
+                    transaction.set_rollback(True)
+                    return Response(
+                        {"error": "Can only approve pending requests"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                for field, value in transition.items():
+                    setattr(purchase_request, field, value)
+                purchase_request.updated_at = now
+                # .update() skips post_save, which normally does these
+                invalidate_finance_stats_cache()
+                touch_request_lists(
+                    purchase_request.created_by_id, RequestStatus.PENDING, purchase_request.status
+                )
+            
+            if transition and approved:
+                # Trigger automatic PO generation; generate_purchase_order
+                # reports its own failures instead of raising, so a failed PO
+                # never fails the approval
+                request_data = {
+                    'title': purchase_request.title,
+                    'description': purchase_request.description,
+                    'amount': str(purchase_request.amount),
+                    'items': [
+                        {
+                            'name': item.item_name,
+                            'description': item.description,
+                            'quantity': item.quantity,
+                            'unit_price': str(item.unit_price),
+                            'total': str(item.total_price)
+                        }
+                        for item in purchase_request.items.all()
+                    ]
+                }
+                
+                # Generate PO using proforma metadata
+                proforma_metadata = purchase_request.proforma_metadata or {}
+                po_data = generate_purchase_order(request_data, proforma_metadata)
+                
+                if po_data.get('generated'):
+                    purchase_request.purchase_order_metadata = po_data
+                    purchase_request.save(update_fields=['purchase_order_metadata', 'updated_at'])
+                else:
+                    logger.warning(
+                        "No purchase order generated for request %s: %s",
+                        purchase_request.pk, po_data.get('error')
+                    )
+
+        # Drop the approvals prefetched by get_object() and load them again,
+        # approvers included, so the response reflects the approval just
+        # recorded without a query per approver
+        purchase_request.refresh_from_db(fields=["approvals"])
+        prefetch_related_objects(
+            [purchase_request], PurchaseRequest.objects.approvals_prefetch()
+        )
+
         return Response(
             PurchaseRequestDetailSerializer(purchase_request).data,
             status=status.HTTP_200_OK
         )
-    
-    @action(detail=True, methods=['post'], url_path='reject')
-    def reject_request(self, request, pk=None):
-        """
-        Reject a purchase request at the approver's level
-        POST /api/approvals/{id}/reject/
-        """
-        # Reuse approve logic with approved=False
-        request.data['approved'] = False
-        return self.approve_request(request, pk)
 
 
 # ==================== FINANCE ENDPOINTS ====================
@@ -443,9 +583,10 @@ class FinanceRequestViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Finance can see all requests, with filtering options
         """
-        queryset = PurchaseRequest.objects.all().prefetch_related(
-            'items', 'approvals', 'approvals__approver'
-        )
+        if self.action == 'list':
+            queryset = PurchaseRequest.objects.list_view()
+        else:
+            queryset = PurchaseRequest.objects.with_detail_relations()
         
         # Filter by status
         status_filter = self.request.query_params.get('status', None)
@@ -453,7 +594,7 @@ class FinanceRequestViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(status=status_filter)
         else:
             # By default, show only approved requests
-            if self.action == 'list':
+            if self.action in ('list', 'export'):
                 queryset = queryset.filter(status=RequestStatus.APPROVED)
         
         # Filter by date range
@@ -476,6 +617,16 @@ class FinanceRequestViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset.order_by('-approved_at', '-created_at')
     
+    def list_scope(self):
+        """List scope covering the list: the status asked for, approved by default"""
+        status_filter = self.request.query_params.get('status', None) or RequestStatus.APPROVED
+        return f"status:{status_filter}" if status_filter in RequestStatus.values else "all"
+    
+    @_conditional_list
+    def list(self, request, *args, **kwargs):
+        """List requests, or 304 while none changed since the client's copy"""
+        return super().list(request, *args, **kwargs)
+    
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
         if self.action == 'list':
@@ -488,18 +639,55 @@ class FinanceRequestViewSet(viewsets.ReadOnlyModelViewSet):
         Get financial statistics for approved requests
         GET /api/finance/statistics/
         """
-        from django.db.models import Sum, Count, Avg
-        from decimal import Decimal
+        stats = cache.get(FINANCE_STATS_CACHE_KEY)
+        if stats is not None:
+            return Response(stats, status=status.HTTP_200_OK)
+        
+        # One pass over the approved requests for every figure
+        stats = PurchaseRequest.objects.filter(status=RequestStatus.APPROVED).aggregate(
+            total_requests=Count('pk'),
+            total_amount=Sum('amount'),
+            average_amount=Avg('amount'),
+            requests_with_receipt=Count('pk', filter=Q(receipt__isnull=False)),
+            requests_without_receipt=Count('pk', filter=Q(receipt__isnull=True)),
+        )
+        stats["total_amount"] = stats["total_amount"] or Decimal('0.00')
+        stats["average_amount"] = stats["average_amount"] or Decimal('0.00')
+        cache.set(FINANCE_STATS_CACHE_KEY, stats, FINANCE_STATS_CACHE_TIMEOUT)
         
-        approved_requests = PurchaseRequest.objects.filter(status=RequestStatus.APPROVED)
+        return Response(stats, status=status.HTTP_200_OK)
+    
+    EXPORT_FIELDS = (
+        'id', 'title', 'amount', 'status', 'created_by__username',
+        'created_at', 'approved_at',
+    )
+    EXPORT_HEADER = (
+        'id', 'title', 'amount', 'status', 'created_by', 'created_at', 'approved_at',
+    )
+    
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Export requests as CSV, honouring the list filters
+        GET /api/finance/export/
         
-        stats = {
-            "total_requests": approved_requests.count(),
-            "total_amount": approved_requests.aggregate(Sum('amount'))['amount__sum'] or Decimal('0.00'),
-            "average_amount": approved_requests.aggregate(Avg('amount'))['amount__avg'] or Decimal('0.00'),
-            "requests_with_receipt": approved_requests.filter(receipt__isnull=False).count(),
-            "requests_without_receipt": approved_requests.filter(receipt__isnull=True).count(),
-        }
+        Rows are streamed from a chunked server-side cursor, so memory use
+        stays flat however many requests match
+        """
+        rows = (
+            self.get_queryset()
+            .prefetch_related(None)
+            .values_list(*self.EXPORT_FIELDS)
+            .iterator(chunk_size=500)
+        )
+        writer = csv.writer(_Echo())
         
-        return Response(stats, status=status.HTTP_200_OK)
+        def stream():
+            yield writer.writerow(self.EXPORT_HEADER)
+            for row in rows:
+                yield writer.writerow([_csv_safe(value) for value in row])
+        
+        response = StreamingHttpResponse(stream(), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="purchase_requests.csv"'
+        return response
 